@@ -1,20 +1,68 @@
 import os
+import hashlib
 import markdown
+import markdown.extensions.codehilite
+import markdown.extensions.fenced_code
 import pdfkit
 import tempfile
 import yaml
 import re
 import html
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from git import Repo, RemoteProgress
 from datetime import datetime
 from packaging import version
 from tqdm import tqdm
 
+# Use the libyaml-backed loader when available, falling back to the pure-Python one
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+# Markdown extensions used to convert every file
+MARKDOWN_EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'footnotes', 'toc', 'abbr', 'attr_list', 'def_list', 'smarty', 'admonition']
+
+# Bump when MARKDOWN_EXTENSIONS or their configuration change, to invalidate the rendered HTML cache
+CACHE_VERSION = b'1'
+
+# Cached HTML also depends on the Markdown and Pygments releases, so an upgrade invalidates it too
+try:
+    import pygments
+    _PYGMENTS_VERSION = pygments.__version__
+except ImportError:
+    _PYGMENTS_VERSION = 'none'
+_CACHE_SALT = b'|'.join([CACHE_VERSION, markdown.__version__.encode(), _PYGMENTS_VERSION.encode()])
+
+# Regular expressions used on every processed file, compiled once
+# Image tags with light/dark sources
+_IMG_RE = re.compile(r'src(?:Light|Dark)="(.*?)"')
+# Headers of extended code blocks with filename and language, followed by any other attributes (e.g. switcher)
+_CODE_HEADER_RE = re.compile(r'```(\w+)?[ \t]+filename="([^"]+)"[^\n]*\n')
+# HTML tags in frontmatter
+_HTML_TAG_ANY_RE = re.compile(r'<[^>]+>')
+# Characters html.escape would replace
+_NEEDS_ESCAPE_RE = re.compile(r'[&<>"\']')
+# Versions like v14.2.0
+_VER_RE = re.compile(r"v(\d+\.\d+\.\d+)")
+
+# Read the main CSS once, it is included directly in every generated HTML document
+with open('styles.css', encoding='utf-8') as _f:
+    _STYLES_CSS = _f.read()
+
+_HTML_HEADER = f"""
+    <html>
+    <head>
+        <style>
+            {_STYLES_CSS}
+        </style>
+    </head>
+    <body>
+    """
 
-def process_image_paths(md_content):
-    # Define a regular expression pattern to find image tags
-    pattern = r'src(?:Light|Dark)="(.*?)"'
 
+def process_image_paths(md_content, base_path, path_args):
     # Function to replace the relative path with an absolute path
     def replace(match):
         relative_path = match.group(1)
@@ -24,50 +72,75 @@ def process_image_paths(md_content):
         return f'src="{absolute_path}"'
 
     # Use the sub method to replace all occurrences
-    return re.sub(pattern, replace, md_content)
+    return _IMG_RE.sub(replace, md_content)
 
 
 def preprocess_code_blocks(md_content):
-    # Regular expression to match extended code blocks with filename and language
-    pattern = r'```(\w+)?\s+filename="([^"]+)"\s*(switcher)?\n(.*?)```'
+    parts = []
+    pos = 0
+
+    # Find each extended code block header, then scan for its closing fence with str.find
+    # (a lazy DOTALL match for the body backtracks badly on unclosed or numerous fences)
+    while True:
+        match = _CODE_HEADER_RE.search(md_content, pos)
+        if not match:
+            break
+        end = md_content.find('```', match.end())
+        if end < 0:
+            break
 
-    def replace(match):
         language = match.group(1) if match.group(1) else ''
         filename = match.group(2)
-        code_block = match.group(4)
+        code_block = md_content[match.end():end]
 
         # Format the header with filename and language
         header = f'<div class="code-header"><i>{filename} ({language})</i></div>' if language else f'<div class="code-header"><i>{filename}</i></div>'
 
-        return f'{header}\n```{language}\n{code_block}\n```'
+        parts.append(md_content[pos:match.start()])
+        parts.append(f'{header}\n```{language}\n{code_block}\n```')
+        pos = end + 3
 
-    # Replace all occurrences in the content
-    return re.sub(pattern, replace, md_content, flags=re.DOTALL)
+    parts.append(md_content[pos:])
+    return ''.join(parts)
 
 
 def safe_load_frontmatter(frontmatter_content):
     try:
-        return yaml.safe_load(frontmatter_content)
+        return yaml.load(frontmatter_content, Loader=_SafeLoader)
     except yaml.YAMLError:
         return None
 
 
-def preprocess_mdx_content(md_content):
-    # Replace HTML tags in frontmatter
-    md_content = re.sub(r'<(/?\w+)>', lambda m: html.escape(m.group(0)), md_content)
-    return md_content
-
-
 def parse_frontmatter(md_content):
-    lines = md_content.split('\n')
-    if lines[0].strip() == '---':
-        end_of_frontmatter = lines.index('---', 1)
-        frontmatter = '\n'.join(lines[1:end_of_frontmatter])
-        content = '\n'.join(lines[end_of_frontmatter + 1:])
-        return frontmatter, content
+    # The opening line may have whitespace around the '---'
+    nl = md_content.find('\n')
+    if nl < 0 or md_content[:nl].strip() != '---':
+        return None, md_content
+
+    # Find the closing '---' line with str.find, without splitting the whole file into lines
+    end = md_content.find('\n---', nl)
+    while end >= 0:
+        after = end + 4
+        if after == len(md_content) or md_content[after] == '\n':
+            return md_content[nl + 1:end], md_content[after + 1:]
+        end = md_content.find('\n---', after)
     return None, md_content
 
 
+def preprocess(md_content, change_img_url, base_path, path_args):
+    # Split off the frontmatter first, so the body passes below only scan the markdown
+    frontmatter, md_content = parse_frontmatter(md_content)
+
+    # Process the markdown content for image paths
+    if change_img_url:
+        md_content = process_image_paths(md_content, base_path, path_args)
+
+    # Process the markdown content for non standard code blocks
+    md_content = preprocess_code_blocks(md_content)
+
+    return frontmatter, md_content
+
+
 class CloneProgress(RemoteProgress):
     def __init__(self):
         super().__init__()
@@ -83,21 +156,18 @@ class CloneProgress(RemoteProgress):
 
 # Clone a specific directory of a repository / branch
 def clone_repo(repo_url, branch, docs_dir, repo_dir):
-    # Initialize and configure the repository for sparse checkout
+    # Clone the latest commit of the branch without file contents, then check out only the docs directory
     if not os.path.isdir(repo_dir):
-        os.makedirs(repo_dir, exist_ok=True)
         print("Cloning repository...")
-        repo = Repo.init(repo_dir)
-        with repo.config_writer() as git_config:
-            git_config.set_value("core", "sparseCheckout", "true")
-
-        # Define the sparse checkout settings
-        with open(os.path.join(repo_dir, ".git/info/sparse-checkout"), "w") as sparse_checkout_file:
-            sparse_checkout_file.write(f"/{docs_dir}\n")
-
-        # Pull the specific directory from the repository
-        origin = repo.create_remote("origin", repo_url)
-        origin.fetch(progress=CloneProgress())
+        repo = Repo.clone_from(
+            repo_url,
+            repo_dir,
+            multi_options=['--filter=blob:none', '--no-checkout', '--depth=1', '--sparse', f'--branch={branch}'],
+            progress=CloneProgress(),
+        )
+
+        # Define the sparse checkout settings, non-cone so the top-level files are not checked out either
+        repo.git.sparse_checkout('set', '--no-cone', f'/{docs_dir}/')
         repo.git.checkout(branch)
         print("Repository cloned.")
 
@@ -106,40 +176,44 @@ def clone_repo(repo_url, branch, docs_dir, repo_dir):
         print("Repository already exists. Updating...")
         repo = Repo(repo_dir)
         origin = repo.remotes.origin
-        origin.fetch(progress=CloneProgress())
+        origin.fetch(branch, depth=1, progress=CloneProgress())
         repo.git.checkout(branch)
-        origin.pull(progress=CloneProgress())
+
+        # A shallow history cannot be merged, so move the branch to the fetched commit
+        repo.git.reset("--hard", f"origin/{branch}")
         print("Repository updated.")
 
 
-def is_file_open(file_path):
-    if not os.path.exists(file_path):
-        return False  # File does not exist, so it's not open
+# Folder depth the section numbering is preallocated for
+MAX_DEPTH = 16
+
+# Files that are listed first within their folder
+INDEX_FILES = frozenset({'index.mdx', 'index.md'})
 
-    try:
-        # Try to open the file in append mode. If the file is open in another program, this might fail
-        with open(file_path, 'a'):
-            pass
-        return False
-    except PermissionError:
-        # If a PermissionError is raised, it's likely the file is open elsewhere
-        return True
+
+def scan_files(root_dir):
+    # Recursively yield (folder, entry) for every regular file, DirEntry already carries the type and full path
+    with os.scandir(root_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # Like os.walk, do not follow symlinked folders
+                if not entry.is_symlink():
+                    yield from scan_files(entry.path)
+            elif entry.is_file():
+                yield root_dir, entry
 
 
 def get_files_sorted(root_dir):
     all_files = []
 
     # Step 1: Traverse the directory structure
-    for root, _, files in os.walk(root_dir):
-        for file in files:
-            full_path = os.path.join(root, file)
-
-            # Step 2: Prioritize 'index.mdx' or 'index.md' within the same folder
-            modified_basename = '!!!' + file if file in ['index.mdx', 'index.md'] else file
-            sort_key = os.path.join(root, modified_basename)
+    for root, entry in scan_files(root_dir):
+        # Step 2: Prioritize 'index.mdx' or 'index.md' within the same folder
+        modified_basename = '!!!' + entry.name if entry.name in INDEX_FILES else entry.name
+        sort_key = os.path.join(root, modified_basename)
 
-            # Add tuple to the list
-            all_files.append((full_path, sort_key))
+        # Add tuple to the list
+        all_files.append((entry.path, sort_key))
 
     # Step 3: Perform a global sort based on modified basename
     all_files.sort(key=lambda x: x[1])
@@ -160,149 +234,226 @@ def preprocess_frontmatter(frontmatter):
         return placeholder
 
     # Replace HTML tags with placeholders
-    modified_frontmatter = re.sub(r'<[^>]+>', replace_tag, frontmatter)
+    modified_frontmatter = _HTML_TAG_ANY_RE.sub(replace_tag, frontmatter)
 
     return modified_frontmatter, html_tags
 
 
 def restore_html_tags(parsed_data, html_tags):
+    # Match all placeholders in a single pass, longest first so HTML_TAG_1 does not match inside HTML_TAG_10
+    placeholder_pattern = None
+    if html_tags:
+        placeholder_pattern = re.compile('|'.join(re.escape(p) for p in sorted(html_tags, key=len, reverse=True)))
+
     if isinstance(parsed_data, dict):
         for key, value in parsed_data.items():
             if isinstance(value, str):
-                for placeholder, tag in html_tags.items():
-                    value = value.replace(placeholder, tag)
+                if placeholder_pattern:
+                    value = placeholder_pattern.sub(lambda m: html_tags[m.group(0)], value)
                 # if key == 'title':  # Escape HTML characters for titles
-                value = html.escape(value)
+                if _NEEDS_ESCAPE_RE.search(value):
+                    value = html.escape(value, quote=True)
                 parsed_data[key] = value
     return parsed_data
 
 
-def process_files(files, repo_dir, docs_dir):
-    # Initialize the Table of Contents
-    toc = ""  
-    html_all_pages_content = ""
+# Highlighted HTML of code blocks already seen by this process, many snippets repeat across pages
+HIGHLIGHT_CACHE_SIZE = 8192
+_highlight_cache = {}
+
+
+class CachedCodeHilite(markdown.extensions.codehilite.CodeHilite):
+    def hilite(self, shebang=True):
+        # The options can hold lists (e.g. hl_lines), so they are keyed by their repr
+        key = (self.src, self.lang, shebang, self.guess_lang, self.use_pygments, self.lang_prefix,
+               repr(self.pygments_formatter), repr(sorted(self.options.items())))
+        code_html = _highlight_cache.get(key)
+        if code_html is None:
+            code_html = super().hilite(shebang)
+            if len(_highlight_cache) < HIGHLIGHT_CACHE_SIZE:
+                _highlight_cache[key] = code_html
+        return code_html
+
+
+# Fenced and indented code blocks look the highlighter up from these modules
+markdown.extensions.codehilite.CodeHilite = CachedCodeHilite
+markdown.extensions.fenced_code.CodeHilite = CachedCodeHilite
 
-    # Initialize an empty string to hold all the HTML content & Include the main CSS directly in the HTML
-    html_header = f"""
-    <html>
-    <head>
-        <style>
-            {open('styles.css').read()}
-        </style>
-    </head>
-    <body>
-    """
 
-    numbering = [0]  # Starting with the first level
-
-    for index, file_path in enumerate(files):
-        with open(file_path, 'r', encoding='utf8') as f:
-            md_content = f.read()
-
-            # Process the markdown content for image paths
-            if Change_img_url:
-                md_content = process_image_paths(md_content)
-
-            # Process the markdown content for non standard code blocks
-            md_content = preprocess_code_blocks(md_content)
-
-            # Parse the frontmatter and markdown
-            frontmatter, md_content = parse_frontmatter(md_content)
-
-            if frontmatter:
-                # Preprocessing: replaces HTML tags with unique placeholders and stores the mappings
-                frontmatter, html_tags = preprocess_frontmatter(frontmatter)
-
-                # Parse the YAML frontmatter
-                data = safe_load_frontmatter(frontmatter)
-                if data is not None:
-
-                    # Preprocessing: After parsing the YAML, restore the HTML tags in place of the placeholders
-                    data = restore_html_tags(data, html_tags)
-                
-                    # Depth Level: Calculate relative path, directory depth and TOC
-                    rel_path = os.path.relpath(file_path, os.path.join(repo_dir, docs_dir))
-
-                    # Depth Level: Calculate the depth of each section
-                    depth = rel_path.count(os.sep)  # Count separators to determine depth
-                    file_basename = os.path.basename(file_path)                    
-                    if file_basename.startswith("index.") and depth > 0:
-                        depth += -1  # or another title for the main index
-                    indent = '&nbsp;' * 5 * depth  # Adjust indentation based on depth
-
-                    # Numbering: Ensure numbering has enough levels
-                    while len(numbering) <= depth:
-                        numbering.append(0)
-
-                    # Numbering: Increment at the current level
-                    numbering[depth] += 1
-
-                    # Numbering: Reset for any lower levels
-                    for i in range(depth + 1, len(numbering)):
-                        numbering[i] = 0
-                    
-                    # Numbering: Create entry
-                    toc_numbering = f"{'.'.join(map(str, numbering[:depth + 1]))}"
-
-                    # TOC: Generate the section title
-                    toc_title = data.get('title', os.path.splitext(os.path.basename(file_path))[0].title())
-                    toc_full_title = f"{toc_numbering} - {toc_title}"
-                    toc += f"{indent}<a href='#{toc_full_title}'>{toc_full_title}</a><br/>"
-
-                    # Page Content: Format the parsed YAML to HTML
-                    html_page_content = f"""
-                    <h1>{toc_full_title}</h1>
-                    <div class="doc-path"><p>Documentation path: {file_path.replace(chr(92),'/').replace('.mdx', '').replace(repo_dir + '/' + docs_dir,'')}</p></div>
-                    <p><strong>Description:</strong> {data.get('description', 'No description')}</p>
+# Markdown converter of the current process, built on first use so each worker sets up the extensions once
+_markdown_converter = None
+
+
+def convert_markdown(md_content):
+    global _markdown_converter
+    if _markdown_converter is None:
+        _markdown_converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+
+    # Reset the per-document state (footnotes, abbreviations, toc ids) before reusing it
+    return _markdown_converter.reset().convert(md_content)
+
+
+def render_markdown(md_content, cache_dir):
+    if not cache_dir:
+        return convert_markdown(md_content)
+
+    # Key the rendered HTML by the preprocessed content, so unchanged files skip the conversion
+    key = hashlib.blake2b(md_content.encode('utf8') + _CACHE_SALT, digest_size=16).hexdigest()
+    cache_path = os.path.join(cache_dir, f'{key}.html')
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return f.read().decode('utf8')
+
+    md_html = convert_markdown(md_content)
+
+    # Write to a temporary name first, other workers may render identical content concurrently
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(md_html.encode('utf8'))
+    os.replace(tmp_path, cache_path)
+    return md_html
+
+
+def render_file(file_path, change_img_url, base_path, path_args, cache_dir):
+    # Runs in a worker process: everything here only depends on the file itself
+    # Read the raw bytes in one unbuffered call and decode them
+    with open(file_path, 'rb', buffering=0) as f:
+        md_content = f.read().decode('utf8')
+
+    # Normalize newlines like text mode did
+    if '\r' in md_content:
+        md_content = md_content.replace('\r\n', '\n').replace('\r', '\n')
+
+    # Parse the frontmatter and preprocess the markdown
+    frontmatter, md_content = preprocess(md_content, change_img_url, base_path, path_args)
+
+    data = None
+    if frontmatter:
+        # Preprocessing: replaces HTML tags with unique placeholders and stores the mappings
+        frontmatter, html_tags = preprocess_frontmatter(frontmatter)
+
+        # Parse the YAML frontmatter
+        data = safe_load_frontmatter(frontmatter)
+        if data is not None:
+            # Preprocessing: After parsing the YAML, restore the HTML tags in place of the placeholders
+            data = restore_html_tags(data, html_tags)
+
+    # Convert Markdown to HTML with table support
+    md_html = render_markdown(md_content, cache_dir)
+
+    # Collect the versions mentioned on the page here too, rather than scanning the whole document afterwards
+    return data, md_html, find_versions(md_html)
+
+
+def process_files(files, repo_dir, docs_dir, change_img_url, base_path, path_args, cache_dir=None):
+    # Initialize the Table of Contents and page content parts, joined once after the loop
+    toc_parts = []
+    html_parts = []
+
+    numbering = [0] * MAX_DEPTH  # One counter per level, starting with the first level
+    versions = set()
+    docs_dir_full_path = os.path.join(repo_dir, docs_dir)
+
+    # Render the files in parallel; map() keeps the results in the input order
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    render = partial(render_file, change_img_url=change_img_url, base_path=base_path, path_args=path_args, cache_dir=cache_dir)
+    with ProcessPoolExecutor() as executor:
+        rendered = executor.map(render, files, chunksize=8)
+
+        # Numbering and TOC depend on the file order, so they are assembled here
+        for index, (file_path, (data, md_html, page_versions)) in enumerate(zip(files, rendered)):
+            versions |= page_versions
+
+            if data is not None:
+                # Depth Level: Calculate relative path, directory depth and TOC
+                rel_path = os.path.relpath(file_path, docs_dir_full_path)
+
+                # Depth Level: Calculate the depth of each section
+                depth = rel_path.count(os.sep)  # Count separators to determine depth
+                file_basename = os.path.basename(file_path)
+                if file_basename.startswith("index.") and depth > 0:
+                    depth += -1  # or another title for the main index
+                indent = '&nbsp;' * 5 * depth  # Adjust indentation based on depth
+
+                # Numbering: Ensure numbering has enough levels (only for unusually deep folders)
+                if depth >= len(numbering):
+                    numbering.extend([0] * (depth + 1 - len(numbering)))
+
+                # Numbering: Increment at the current level
+                numbering[depth] += 1
+
+                # Numbering: Reset for any lower levels
+                numbering[depth + 1:] = [0] * (len(numbering) - depth - 1)
+
+                # Numbering: Create entry
+                toc_numbering = f"{'.'.join(map(str, numbering[:depth + 1]))}"
+
+                # TOC: Generate the section title
+                toc_title = data.get('title', os.path.splitext(os.path.basename(file_path))[0].title())
+                toc_full_title = f"{toc_numbering} - {toc_title}"
+                toc_parts.append(f"{indent}<a href='#{toc_full_title}'>{toc_full_title}</a><br/>")
+
+                # Page Content: Documentation path relative to the docs folder, without the extension
+                doc_path = '/' + rel_path.replace(os.sep, '/')
+                if doc_path.endswith('.mdx'):
+                    doc_path = doc_path[:-4]
+
+                # Page Content: Format the parsed YAML to HTML
+                html_page_content = f"""
+                <h1>{toc_full_title}</h1>
+                <div class="doc-path"><p>Documentation path: {doc_path}</p></div>
+                <p><strong>Description:</strong> {data.get('description', 'No description')}</p>
+                """
+                related = data.get('related') or {}
+                if related:
+                    html_page_content += f"""
+                    <div style="margin-left:20px;">
+                        <p><strong>Related:</strong></p>
+                        <p><strong>Title:</strong> {related.get('title', 'Related')}</p>
+                        <p><strong>Related Description:</strong> {related.get('description', 'No related description')}</p>
+                        <p><strong>Links:</strong></p>
+                    <ul>
+                        {''.join(f'<li>{link}</li>' for link in related.get('links', []))}
+                    </ul>
+                    </div>
                     """
-                    if data.get('related', {}):
-                        html_page_content += f"""
-                        <div style="margin-left:20px;">
-                            <p><strong>Related:</strong></p>
-                            <p><strong>Title:</strong> {data.get('related', {}).get('title', 'Related')}</p>
-                            <p><strong>Related Description:</strong> {data.get('related', {}).get('description', 'No related description')}</p>
-                            <p><strong>Links:</strong></p>
-                        <ul>
-                            {''.join([f'<li>{link}</li>' for link in data.get('related', {}).get('links', [])])}
-                        </ul>
-                        </div>
-                        """
-                    html_page_content += '</br>'
-
-                else:
-                    html_page_content = ""
+                html_page_content += '</br>'
+
+                # The header holds the TOC title as well, so this covers every version in the document
+                versions |= find_versions(html_page_content)
+
             else:
                 html_page_content = ""
 
-            # Convert Markdown to HTML with table support and add content to the identified header
-            html_page_content += markdown.markdown(md_content, extensions=['fenced_code', 'codehilite', 'tables', 'footnotes', 'toc', 'abbr', 'attr_list', 'def_list', 'smarty', 'admonition'])
-            
+            # Add the converted Markdown to the identified header
+            html_page_content += md_html
+
             # Add page content to all cumulated pages content
-            html_all_pages_content += html_page_content
+            html_parts.append(html_page_content)
 
             # Add a page break unless it is the last file
             if index < len(files) - 1:
-                html_all_pages_content += '<div class="page-break"></div>'
-    
+                html_parts.append('<div class="page-break"></div>')
+
+    toc = ''.join(toc_parts)
+
     # Prepend the ToC to the beginning of the HTML content
     toc_html = f"""<div style="padding-bottom: 10px"><div style="padding-bottom: 20px"><h1>Table of Contents</h1></div>{toc}</div><div style="page-break-before: always;">"""
-    html_all_content = toc_html + html_all_pages_content
 
-    # Finalize html formatting
-    html_all_pages_content  = html_header + html_all_pages_content + "</body></html>"
-    toc_html                = html_header + toc_html + "</body></html>"
-    html_all_content        = html_header + html_all_content + "</body></html>"
+    # Finalize html formatting, the parts are written out in order without joining them into one string
+    return [_HTML_HEADER, toc_html, *html_parts, "</body></html>"], find_latest_version(versions)
+
 
-    return(html_all_content, toc_html, html_all_pages_content)
+def find_versions(html_content):
+    return set(_VER_RE.findall(html_content))
 
 
-def find_latest_version(html_content):
-    # Regular expression to find versions like v14.2.0
-    version_pattern = re.compile(r"v(\d+\.\d+\.\d+)")
-    versions = version_pattern.findall(html_content)
-    # Remove duplicates and sort versions
-    unique_versions = sorted(set(versions), key=lambda v: version.parse(v), reverse=True)
-    return unique_versions[0] if unique_versions else None
+def find_latest_version(versions):
+    # Pick the highest of the unique versions
+    if not versions:
+        return None
+    return max(versions, key=version.parse)
 
 
 if __name__ == "__main__":
@@ -323,6 +474,9 @@ if __name__ == "__main__":
     base_path = "https://nextjs.org/_next/image?url="
     path_args = "&w=1920&q=75"
 
+    # Cache the rendered HTML of each file between runs
+    cache_dir = ".cache"
+
     # Clone the repository
     clone_repo(repo_url, branch, docs_dir, repo_dir)
 
@@ -330,17 +484,16 @@ if __name__ == "__main__":
     print ("Converting the Documentation to HTML...")
     docs_dir_full_path = os.path.join(repo_dir, docs_dir)
     files_to_process = get_files_sorted(docs_dir_full_path)
-    html_all_content, _, _ = process_files(files_to_process, repo_dir, docs_dir)
+    html_all_parts, latest_version = process_files(files_to_process, repo_dir, docs_dir, Change_img_url, base_path, path_args, cache_dir)
     print("Converted all MDX to HTML.")
 
     # Save the HTML content to a file for inspection
     if export_html:
         with open('output.html', 'w', encoding='utf8') as f:
-            f.write(html_all_content)
+            f.writelines(html_all_parts)
             print("HTML Content exported.")
 
-    # Find the latest version in the HTML content
-    latest_version = find_latest_version(html_all_content)
+    # Name the PDF after the latest version found in the HTML content
     if latest_version:
         project_title = f"""Next.js Documentation v{latest_version}"""
         output_pdf = f"""Next.js_Docs_v{latest_version}_{datetime.now().strftime("%Y-%m-%d")}.pdf"""
@@ -349,14 +502,7 @@ if __name__ == "__main__":
         output_pdf = "Next.js_Documentation.pdf"
 
     # Define the cover HTML with local CSS file
-    cover_html = f"""
-    <html>
-        <head>
-            <style>
-                {open('styles.css').read()}
-            </style>
-        </head>
-        <body>
+    cover_html = _HTML_HEADER + f"""
             <div class="master-container">
                 <div class="container">
                     <div class="title">{project_title}</div>
@@ -372,10 +518,12 @@ if __name__ == "__main__":
         cover_file.write(cover_html.encode('utf-8'))
         print("HTML Cover exported.")
 
-    # Convert the combined HTML content to PDF with a cover and a table of contents
-    if is_file_open(output_pdf):
-        print("The output file is already open in another process. Please close it and try again.")
-    else:
+    html_file = None
+    try:
+        # Write the HTML content part by part to a temporary file that wkhtmltopdf reads directly
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False, suffix='.html') as html_file:
+            html_file.writelines(html_all_parts)
+
         options = {
             'encoding': 'UTF-8',
             'page-size': 'A4',
@@ -385,8 +533,20 @@ if __name__ == "__main__":
             # 'no-outline': None,
             # 'no-images': None,
         }
-        pdfkit.from_string(html_all_content, output_pdf, options=options, cover=cover_file.name, toc={})
-        print("Created the PDF file successfully.")
 
-    # Delete the temporary file
-    os.unlink(cover_file.name)
\ No newline at end of file
+        # Convert the combined HTML content to PDF with a cover and a table of contents
+        try:
+            pdfkit.from_file(html_file.name, output_pdf, options=options, cover=cover_file.name, toc={})
+            print("Created the PDF file successfully.")
+        except OSError as e:
+            print("Could not create the PDF file:", e)
+            # An existing output file may be locked because it is open in another program
+            if os.path.exists(output_pdf):
+                print("If the PDF file is open in another program, please close it and try again.")
+            raise SystemExit(1)
+
+    finally:
+        # Delete the temporary files
+        os.unlink(cover_file.name)
+        if html_file is not None:
+            os.unlink(html_file.name)
\ No newline at end of file